@@ -1,12 +1,26 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from datetime import datetime, timedelta
 import time
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 
 # Import our helper modules
 from schwab_wrapper import SchwabAPI
 from technicals import calculate_rsi, find_support_resistance
+from screener import screen_premium_leaders
+
+# Per-contract fields pulled out of the Schwab callExpDateMap
+CHAIN_FIELDS = ('strikePrice', 'delta', 'gamma', 'theta', 'vega', 'rho', 'bid', 'ask',
+                'volatility', 'totalVolume', 'openInterest')
+
+# Column order of the CSV export
+CSV_COLUMNS = ['Symbol', 'Underlying Price', 'Expiry Date', 'DTE', 'Strike Price', 'Bid', 'Ask',
+               'Premium (Mid)', 'Break Even', 'ARIF', 'Stability Score', 'Volume', 'Open Interest',
+               'IV', 'Delta', 'Gamma', 'Theta', 'Vega', 'Rho', 'Intrinsic Value']
 
 st.set_page_config(page_title="Risk-Adjusted Covered Call Analyzer", layout="wide")
 
@@ -74,6 +88,153 @@ if auth_button:
     else:
         st.sidebar.warning("Please enter both Key and Secret.")
 
+# --- Cached API Fetches ---
+# Widget changes (Max Delta, Number of Weeks) rerun the script; serve repeat
+# requests for the same ticker from memory instead of hitting the API again.
+# The leading underscore keeps Streamlit from hashing the SchwabAPI object, so
+# the cache is keyed on the request arguments only and is shared by every
+# session on this server, whatever credentials it authenticated with. That is
+# intended: these endpoints return market data, not account data.
+# Only successful responses are cached. st.cache_data does not store calls that
+# raise, so errors are raised inside the cached function and turned back into
+# the SchwabAPI (data, error) tuple outside it; a retry then hits the API again.
+
+class _FetchError(Exception):
+    pass
+
+def _raise_on_error(result):
+    data, err = result
+    if err:
+        raise _FetchError(err)
+    return data
+
+def _as_result(cached_fetch):
+    def fetch(*args):
+        try:
+            return cached_fetch(*args), None
+        except _FetchError as e:
+            return None, str(e)
+    return fetch
+
+@_as_result
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_quote(_api, ticker):
+    return _raise_on_error(_api.get_quote(ticker))
+
+@_as_result
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_price_history(_api, ticker):
+    return _raise_on_error(_api.get_price_history(ticker))
+
+@_as_result
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_option_chain(_api, ticker, num_weeks):
+    return _raise_on_error(_api.get_option_chain(ticker, num_weeks))
+
+# --- Candidate Screening ---
+# Cached on the serialized chain plus the strategy inputs, so reruns (widget
+# changes) reuse the computed DataFrame without recomputing or copying it.
+# The result is shared: treat it as read-only.
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _compute_candidates(call_map_json, spot_price, max_delta, num_weeks):
+    """
+    Returns the premium leader per expiry for the next `num_weeks` expirations,
+    ranked by Stability Score. Empty if no option meets the filters.
+    """
+    call_map = orjson.loads(call_map_json)
+    
+    # Step 1: Select the next N weekly expirations chronologically
+    sorted_keys = sorted(call_map.keys())
+    target_expiries = sorted_keys[:num_weeks]
+    
+    # Step 2: Flatten the selected expiries into one record per contract
+    records = []
+    for exp_key in target_expiries:
+        parts = exp_key.split(':')
+        dte = int(parts[1]) if len(parts) > 1 else 0
+        records.extend(
+            (parts[0], dte, *(options_list[0].get(field) for field in CHAIN_FIELDS))
+            for options_list in call_map.get(exp_key, {}).values()
+        )
+    
+    df_chain = pd.DataFrame.from_records(records, columns=['Expiration', 'DTE', *CHAIN_FIELDS])
+    chain = {
+        field: np.nan_to_num(pd.to_numeric(df_chain[field], errors='coerce').to_numpy(dtype=np.float64))
+        for field in CHAIN_FIELDS
+    }
+    
+    # Handle DTE edge case
+    dte = df_chain['DTE'].to_numpy()
+    calc_dte = np.where(dte > 0, dte, 0.5)
+    
+    # Step 3: Filter and select the max premium option per expiry date in one compiled pass
+    expirations, exp_id = np.unique(df_chain['Expiration'].to_numpy(dtype=str), return_inverse=True)
+    rows = screen_premium_leaders(chain['strikePrice'], chain['delta'], chain['bid'], chain['ask'],
+                                  chain['openInterest'], exp_id, len(expirations), spot_price, max_delta)
+    leader = {field: values[rows] for field, values in chain.items()}
+    calc_dte = calc_dte[rows]
+    
+    premium = (leader['bid'] + leader['ask']) * 0.5
+    gamma = leader['gamma']
+    theta = leader['theta']
+    
+    # Calculate Metrics
+    # ARIF = (Premium × 365 × 100) / (Stock_Price × DTE)
+    arif = premium * 36500.0 / (spot_price * calc_dte)
+    
+    # Stability Score = Theta / Gamma
+    stability_score = np.divide(np.abs(theta), gamma, out=np.zeros_like(theta), where=gamma > 0)
+    
+    premium_leaders = pd.DataFrame({
+        'Expiration': expirations[exp_id[rows]],
+        'DTE': calc_dte.astype(int),
+        'Strike': leader['strikePrice'],
+        'Premium': premium,
+        'Delta': leader['delta'],
+        'Gamma': gamma,
+        'Theta': theta,
+        'Vega': leader['vega'],
+        'Rho': leader['rho'],
+        'IV': leader['volatility'] * 100,  # Convert to percentage
+        'ARIF': arif,
+        'Stability Score': stability_score,
+        'Bid': leader['bid'],
+        'Ask': leader['ask'],
+        'Volume': leader['totalVolume'].astype(int),
+        'OI': leader['openInterest'].astype(int)
+    })
+    
+    # Step 4: Sort by Stability Score (Descending), then by IV (Descending) as tie-breaker
+    order = np.lexsort((-premium_leaders['IV'].to_numpy(), -premium_leaders['Stability Score'].to_numpy()))
+    premium_leaders = premium_leaders.iloc[order]
+    
+    # Step 5: Use All Premium Leaders (one per expiry date)
+    return premium_leaders.reset_index(drop=True)
+
+def _candidates_csv(df_all, ticker, spot_price):
+    """
+    Serializes the ranked candidates to CSV bytes for the download button.
+    Called once per analysis; the bytes are kept in session state.
+    """
+    # Prepare data for CSV (already filtered and sorted)
+    df_csv = df_all.rename(columns={
+        'Expiration': 'Expiry Date',
+        'Strike': 'Strike Price',
+        'Premium': 'Premium (Mid)',
+        'OI': 'Open Interest'
+    })
+    df_csv['Symbol'] = ticker
+    df_csv['Underlying Price'] = spot_price
+    df_csv['Break Even'] = df_csv['Strike Price'] + df_csv['Premium (Mid)']
+    df_csv['IV'] = df_csv['IV'] / 100  # Convert back to decimal
+    df_csv['Intrinsic Value'] = 0  # OTM calls have no intrinsic value
+    df_csv = df_csv[CSV_COLUMNS]
+    
+    buf = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df_csv, preserve_index=False), buf)
+    return buf.getvalue().to_pybytes()
+
 # --- Main Logic ---
 
 st.markdown("### ⚙️ Strategy Configuration")
@@ -95,8 +256,14 @@ if analyze_btn:
     else:
         api = st.session_state.schwab_api
         with st.spinner(f"Fetching data for {ticker}..."):
-            # 1. Fetch Quote (Spot Price & Fundamentals)
-            quote_data, q_err = api.get_quote(ticker)
+            # The three requests are independent, so issue them concurrently
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                quote_future = executor.submit(_fetch_quote, api, ticker)
+                hist_future = executor.submit(_fetch_price_history, api, ticker)
+                chain_future = executor.submit(_fetch_option_chain, api, ticker, num_weeks)
+            
+            # 1. Quote (Spot Price & Fundamentals)
+            quote_data, q_err = quote_future.result()
             if q_err:
                 st.error(f"Failed to get quote: {q_err}")
                 st.stop()
@@ -104,13 +271,11 @@ if analyze_btn:
             # Extract basic data
             # Schwab quote structure varies. Usually { symbol: { quote: {...}, fundamental: {...} } }
             try:
-                if ticker in quote_data:
-                    base_data = quote_data[ticker]
-                else:
-                    # sometimes response is just the object?
-                    base_data = list(quote_data.values())[0]
+                # sometimes response is just the object?
+                base_data = quote_data.get(ticker) or next(iter(quote_data.values()), {})
                 
-                spot_price = base_data.get('quote', {}).get('lastPrice') or base_data.get('quote', {}).get('closePrice')
+                quote = base_data.get('quote', {})
+                spot_price = quote.get('lastPrice') or quote.get('closePrice')
                 if not spot_price:
                     st.error("Could not find spot price in response.")
                     st.stop()
@@ -126,31 +291,29 @@ if analyze_btn:
                 st.error(f"Error parsing quote data: {e}")
                 st.stop()
 
-            # 2. Fetch Price History for Technicals
-            hist_data, h_err = api.get_price_history(ticker)
+            # 2. Price History for Technicals
+            hist_data, h_err = hist_future.result()
             rsi_val = None
             support_val = None
             resistance_val = None
             
-            if not h_err and 'candles' in hist_data:
-                # Need to convert to DataFrame
-                candles = hist_data['candles']
-                df_hist = pd.DataFrame(candles)
+            if not h_err and hist_data.get('candles'):
                 # Schwab candles: 'close', 'datetime', 'high', 'low', 'open', 'volume'
-                df_hist['close'] = df_hist['close']
+                # Only closes are needed, so skip the DataFrame and go straight to NumPy
+                candles = hist_data['candles']
+                closes = np.fromiter((c['close'] for c in candles), dtype=np.float64, count=len(candles))
                 
                 # Calculate RSI
-                if len(df_hist) > 14:
-                    df_hist['rsi'] = calculate_rsi(df_hist['close'])
-                    rsi_val = df_hist['rsi'].iloc[-1]
+                if len(closes) > 14:
+                    rsi_val = calculate_rsi(closes)[-1]
                 
                 # Calculate S/R
-                support_val, resistance_val = find_support_resistance(df_hist, spot_price)
+                support_val, resistance_val = find_support_resistance(closes, spot_price)
             else:
                 st.warning("Could not fetch price history for technicals.")
 
-            # 3. Fetch Option Chain
-            chain_data, c_err = api.get_option_chain(ticker)
+            # 3. Option Chain
+            chain_data, c_err = chain_future.result()
             if c_err:
                 st.error(f"Failed to get option chain: {c_err}")
                 st.stop()
@@ -179,120 +342,18 @@ if analyze_btn:
                 st.error("No option chain data found.")
                 st.stop()
             
-            # Step 1: Select the next N weekly expirations chronologically
-            sorted_keys = sorted(call_map.keys())
-            target_expiries = sorted_keys[:num_weeks]
-            
-            if not target_expiries:
-                st.warning(f"No expiries found.")
-                st.stop()
-            
-            # Step 2: Collect options from selected expiries and apply filters
-            all_candidates = []
+            df_all = _compute_candidates(orjson.dumps(call_map), spot_price, max_delta, num_weeks)
             
-            for exp_key in target_expiries:
-                strikes_map = call_map.get(exp_key, {})
-                parts = exp_key.split(':')
-                exp_date_str = parts[0]
-                dte = int(parts[1]) if len(parts) > 1 else 0
-                
-                # Handle DTE edge case
-                calc_dte = dte if dte > 0 else 0.5
-                
-                for strike_str, options_list in strikes_map.items():
-                    opt = options_list[0]
-                    
-                    try:
-                        delta = float(opt.get('delta', 0) or 0)
-                        gamma = float(opt.get('gamma', 0) or 0)
-                        theta = float(opt.get('theta', 0) or 0)
-                        bid = float(opt.get('bid', 0) or 0)
-                        ask = float(opt.get('ask', 0) or 0)
-                        strike = float(opt.get('strikePrice', 0))
-                        iv = float(opt.get('volatility', 0) or 0)
-                        oi = int(opt.get('openInterest', 0) or 0)
-                        
-                        premium = (bid + ask) / 2
-                        
-                        # Filter 1: Delta <= Max_Delta (risk tolerance)
-                        if delta <= 0 or delta > max_delta:
-                            continue
-                        
-                        # Filter 2: Must be OTM
-                        if strike <= spot_price:
-                            continue
-                        
-                        # Filter 3: Open Interest must be > 0
-                        if oi == 0:
-                            continue
-                        
-                        # Filter 4: Bid must be > 0
-                        if bid == 0:
-                            continue
-                        
-                        # Calculate Metrics
-                        # ARIF = (Premium × 365 × 100) / (Stock_Price × DTE)
-                        arif = (premium * 365 * 100) / (spot_price * calc_dte)
-                        
-                        # Stability Score = Theta / Gamma
-                        abs_theta = abs(theta)
-                        if gamma > 0:
-                            stability_score = abs_theta / gamma
-                        else:
-                            stability_score = 0
-                        
-                        # Store candidate
-                        all_candidates.append({
-                            'Expiration': exp_date_str,
-                            'DTE': int(calc_dte),
-                            'Strike': strike,
-                            'Premium': premium,
-                            'Delta': delta,
-                            'Gamma': gamma,
-                            'Theta': theta,
-                            'IV': iv * 100,  # Convert to percentage
-                            'ARIF': arif,
-                            'Stability Score': stability_score,
-                            'Bid': bid,
-                            'Ask': ask,
-                            'Volume': opt.get('totalVolume', 0),
-                            'OI': oi
-                        })
-                        
-                    except (ValueError, TypeError):
-                        continue
-            
-            if not all_candidates:
+            if df_all.empty:
                 st.warning(f"No options found meeting criteria (Delta ≤ {max_delta}) for the next {num_weeks} weeks.")
                 st.stop()
             
-            # Step 3: Group by Expiry Date and Select Max Premium per Date
-            from collections import defaultdict
-            expiry_groups = defaultdict(list)
-            
-            for candidate in all_candidates:
-                expiry_groups[candidate['Expiration']].append(candidate)
-            
-            # Select the option with max premium from each expiry date
-            premium_leaders = []
-            for expiry, options in expiry_groups.items():
-                # Sort by premium descending and take the first (highest premium)
-                options.sort(key=lambda x: x['Premium'], reverse=True)
-                premium_leaders.append(options[0])
-            
-            
-            # Step 4: Sort by Stability Score (Descending), then by IV (Descending) as tie-breaker
-            premium_leaders.sort(key=lambda x: (x['Stability Score'], x['IV']), reverse=True)
-            
-            # Step 5: Use All Premium Leaders (one per expiry date)
-            all_results = premium_leaders
-            
             # Store results in session state to persist across reruns (e.g., when downloading CSV)
             st.session_state.analysis_results = {
-                'all_results': all_results,
+                'df_all': df_all,
+                'csv_bytes': _candidates_csv(df_all, ticker, spot_price),
                 'ticker': ticker,
                 'spot_price': spot_price,
-                'call_map': call_map,
                 'num_weeks': num_weeks,
                 'max_delta': max_delta,
                 'has_results': True
@@ -301,16 +362,15 @@ if analyze_btn:
 # Display results from session state (persists across reruns)
 if st.session_state.get('analysis_results', {}).get('has_results', False):
     results = st.session_state.analysis_results
-    all_results = results['all_results']
+    df_all = results['df_all']
     ticker = results['ticker']
     spot_price = results['spot_price']
-    call_map = results['call_map']
     num_weeks = results['num_weeks']
     max_delta = results['max_delta']
     
     # Display Results
-    if all_results:
-        best_pick = all_results[0]
+    if not df_all.empty:
+        best_pick = df_all.iloc[0]
         
         # Calculate additional metrics for display
         strike_distance_pct = ((best_pick['Strike'] - spot_price) / spot_price) * 100
@@ -333,13 +393,14 @@ if st.session_state.get('analysis_results', {}).get('has_results', False):
         
         # Find Second Best (from week #2 onwards)
         # Get the first expiration date (week #1)
-        first_expiry = min([r['Expiration'] for r in all_results])
+        expirations = df_all['Expiration'].to_numpy()
+        first_expiry = expirations.min()
         
         # Filter out week #1 options
-        week2_plus = [r for r in all_results if r['Expiration'] != first_expiry]
+        week2_plus = np.flatnonzero(expirations != first_expiry)
         
-        if week2_plus:
-            second_best = week2_plus[0]  # Already sorted by stability score
+        if week2_plus.size:
+            second_best = df_all.iloc[week2_plus[0]]  # Already sorted by stability score
             
             # Calculate metrics for second best
             strike_distance_pct_2 = ((second_best['Strike'] - spot_price) / spot_price) * 100
@@ -363,24 +424,25 @@ if st.session_state.get('analysis_results', {}).get('has_results', False):
         
         # Display All Candidates Table
         st.markdown("### 📊 All Candidates (Ranked by Stability Score)")
-        df_all = pd.DataFrame(all_results)
-        
         # Reorder columns for clarity
         display_cols = ['Expiration', 'DTE', 'Strike', 'Premium', 'Delta', 'Gamma', 
                        'Theta', 'IV', 'Stability Score', 'ARIF', 'Volume', 'OI']
-        df_display = df_all[display_cols].copy()
-        
-        # Format for display
-        df_display['Strike'] = df_display['Strike'].apply(lambda x: f"${x:.2f}")
-        df_display['Premium'] = df_display['Premium'].apply(lambda x: f"${x:.2f}")
-        df_display['Delta'] = df_display['Delta'].apply(lambda x: f"{x:.3f}")
-        df_display['Gamma'] = df_display['Gamma'].apply(lambda x: f"{x:.4f}")
-        df_display['Theta'] = df_display['Theta'].apply(lambda x: f"{x:.4f}")
-        df_display['IV'] = df_display['IV'].apply(lambda x: f"{x:.1f}%")
-        df_display['Stability Score'] = df_display['Stability Score'].apply(lambda x: f"{x:.4f}")
-        df_display['ARIF'] = df_display['ARIF'].apply(lambda x: f"{x:.2f}%")
         
-        st.dataframe(df_display, use_container_width=True)
+        # Format for display (rendered client-side; columns stay numeric and sortable)
+        st.dataframe(
+            df_all[display_cols],
+            use_container_width=True,
+            column_config={
+                'Strike': st.column_config.NumberColumn(format="$%.2f"),
+                'Premium': st.column_config.NumberColumn(format="$%.2f"),
+                'Delta': st.column_config.NumberColumn(format="%.3f"),
+                'Gamma': st.column_config.NumberColumn(format="%.4f"),
+                'Theta': st.column_config.NumberColumn(format="%.4f"),
+                'IV': st.column_config.NumberColumn(format="%.1f%%"),
+                'Stability Score': st.column_config.NumberColumn(format="%.4f"),
+                'ARIF': st.column_config.NumberColumn(format="%.2f%%"),
+            }
+        )
     else:
         st.warning("No candidates found.")
 
@@ -388,47 +450,14 @@ if st.session_state.get('analysis_results', {}).get('has_results', False):
     st.markdown("### 📥 Download Filtered Options")
     st.markdown(f"Export All Candidates: Next {num_weeks} Weeks | Delta ≤ {max_delta} | Sorted by Stability Score")
     
-    # Use the same all_results from main analysis for CSV export
-    if all_results:
-        # Prepare data for CSV (already filtered and sorted)
-        csv_data = []
-        
-        for candidate in all_results:
-            row = {
-                "Symbol": ticker,
-                "Underlying Price": spot_price,
-                "Expiry Date": candidate['Expiration'],
-                "DTE": candidate['DTE'],
-                "Strike Price": candidate['Strike'],
-                "Bid": candidate['Bid'],
-                "Ask": candidate['Ask'],
-                "Premium (Mid)": candidate['Premium'],
-                "Break Even": candidate['Strike'] + candidate['Premium'],
-                "ARIF": candidate['ARIF'],
-                "Stability Score": candidate['Stability Score'],
-                "Volume": candidate['Volume'],
-                "Open Interest": candidate['OI'],
-                "IV": candidate['IV'] / 100,  # Convert back to decimal
-                "Delta": candidate['Delta'],
-                "Gamma": candidate['Gamma'],
-                "Theta": candidate['Theta'],
-                "Vega": candidate.get('Vega', 0),  # These might not exist in dict
-                "Rho": candidate.get('Rho', 0),
-                "Intrinsic Value": 0  # OTM calls have no intrinsic value
-            }
-            csv_data.append(row)
-                
-        if csv_data:
-            df_csv = pd.DataFrame(csv_data)
-            csv_string = df_csv.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="Download All Candidates CSV",
-                data=csv_string,
-                file_name=f"{ticker}_Covered_Calls_{datetime.now().strftime('%Y%m%d')}.csv",
-                mime="text/csv"
-            )
-        else:
-            st.info("No data to export.")
+    # Use the same df_all from main analysis for CSV export
+    if not df_all.empty:
+        csv_string = results['csv_bytes']
+        st.download_button(
+            label="Download All Candidates CSV",
+            data=csv_string,
+            file_name=f"{ticker}_Covered_Calls_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
     else:
         st.warning(f"No options found for export.")
-
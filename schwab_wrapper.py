@@ -1,6 +1,7 @@
 import requests
 import base64
 import json
+import orjson
 import pandas as pd
 from datetime import datetime, timedelta
 
@@ -11,6 +12,8 @@ class SchwabAPI:
         self.base_url = "https://api.schwabapi.com/marketdata/v1"
         self.token_url = "https://api.schwabapi.com/v1/oauth/token"
         self.access_token = None
+        # Pooled session so the quote/history/chain calls reuse one TLS connection
+        self.session = requests.Session()
 
     def authenticate(self):
         """
@@ -27,18 +30,19 @@ class SchwabAPI:
         # If the user provides a refresh token flow in reality, we might need to adjust.
         # For now, sticking to the simplest interpretation of "Client ID + Secret".
         
-        response = requests.post(self.token_url, headers=headers, data=data)
+        response = self.session.post(self.token_url, headers=headers, data=data)
         if response.status_code == 200:
             self.access_token = response.json().get('access_token')
+            self.session.headers.update({'Authorization': f'Bearer {self.access_token}'})
             return True, "Authenticated successfully"
         else:
             return False, f"Auth Failed: {response.text}"
 
-    def get_option_chain(self, symbol):
+    def get_option_chain(self, symbol, num_weeks=None):
         """
         Fetches option chain for the symbol.
-        Filters will be applied in the application logic, but we can pre-filter here if API allows.
-        We strictly need data for the next 5 weeks.
+        Filters will be applied in the application logic, but we pre-filter here where the API allows.
+        If num_weeks is given, only expirations within the next num_weeks (+1 week of slack) are requested.
         """
         if not self.access_token:
             return None, "Not authenticated"
@@ -56,15 +60,18 @@ class SchwabAPI:
             'contractType': 'CALL',
             'includeUnderlyingQuote': 'TRUE',
             'range': 'OTM',  # 0.30 delta is OTM for calls
-             # We might need to handle dates. API allows fromDate/toDate.
-             # We'll fetch all and filter in Python to ensure we get exactly 5 weeks.
         }
         
-        headers = {'Authorization': f'Bearer {self.access_token}'}
+        if num_weeks:
+            # Let the API drop LEAPS/monthlies we would discard anyway.
+            # The app still takes exactly the first num_weeks expirations.
+            today = datetime.now().date()
+            params['fromDate'] = today.isoformat()
+            params['toDate'] = (today + timedelta(weeks=num_weeks + 1)).isoformat()
         
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self.session.get(endpoint, params=params)
         if response.status_code == 200:
-            return response.json(), None
+            return orjson.loads(response.content), None
         else:
             return None, f"Error fetching chains: {response.text}"
 
@@ -88,11 +95,9 @@ class SchwabAPI:
             'frequency': 1
         }
         
-        headers = {'Authorization': f'Bearer {self.access_token}'}
-        
-        response = requests.get(endpoint, headers=headers, params=params)
+        response = self.session.get(endpoint, params=params)
         if response.status_code == 200:
-            return response.json(), None
+            return orjson.loads(response.content), None
         else:
             return None, f"Error fetching history: {response.text}"
 
@@ -104,10 +109,9 @@ class SchwabAPI:
             return None, "Not authenticated"
             
         endpoint = f"{self.base_url}/{symbol}/quotes"
-        headers = {'Authorization': f'Bearer {self.access_token}'}
         
-        response = requests.get(endpoint, headers=headers)
+        response = self.session.get(endpoint)
         if response.status_code == 200:
-            return response.json(), None
+            return orjson.loads(response.content), None
         else:
             return None, f"Error fetching quote: {response.text}"
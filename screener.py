@@ -0,0 +1,36 @@
+import numpy as np
+from numba import njit
+
+@njit(cache=True)
+def screen_premium_leaders(strike, delta, bid, ask, oi, exp_id, n_expiries, spot_price, max_delta):
+    """
+    Single pass over the flattened chain: applies the covered call filters and
+    keeps the max premium option per expiry (exp_id in [0, n_expiries)).
+    Returns the row index of each expiry's leader, in exp_id order.
+    """
+    best_premium = np.zeros(n_expiries)
+    best_row = np.full(n_expiries, -1, dtype=np.int64)
+    for i in range(strike.shape[0]):
+        # Filter 1: Delta <= Max_Delta (risk tolerance)
+        if delta[i] <= 0 or delta[i] > max_delta:
+            continue
+        
+        # Filter 2: Must be OTM
+        if strike[i] <= spot_price:
+            continue
+        
+        # Filter 3: Open Interest must be > 0
+        if oi[i] <= 0:
+            continue
+        
+        # Filter 4: Bid must be > 0
+        if bid[i] <= 0:
+            continue
+        
+        # Keep the first option seen with the highest premium
+        premium = (bid[i] + ask[i]) / 2
+        e = exp_id[i]
+        if best_row[e] < 0 or premium > best_premium[e]:
+            best_premium[e] = premium
+            best_row[e] = i
+    return best_row[best_row >= 0]